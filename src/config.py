@@ -476,6 +476,9 @@ config = mlc.ConfigDict(
             # Use DeepSpeed memory-efficient attention kernel. Mutually
             # exclusive with use_lma and use_flash.
             "use_deepspeed_evo_attention": False,
+            # Compile the sigmoid gating products into fused Triton kernels
+            # on CUDA. Ignored on CPU or when Triton is not installed.
+            "compile_gates": False,
             # Use Staats & Rabe's low-memory attention algorithm. Mutually
             # exclusive with use_deepspeed_evo_attention and use_flash.
             "use_lma": False,
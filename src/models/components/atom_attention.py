@@ -28,7 +28,7 @@ from torch import Tensor
 from torch import nn
 from torch.nn import functional as F
 from typing import Dict, NamedTuple, Optional, Tuple
-from src.models.components.primitives import AdaLN, Linear, LinearNoBias, Attention
+from src.models.components.primitives import AdaLN, Linear, LinearNoBias, Attention, sigmoid_gate
 from torch.nn import LayerNorm
 from src.models.components.transition import ConditionedTransitionBlock
 from einops import rearrange
@@ -214,7 +214,7 @@ class AtomAttentionPairBias(nn.Module):
         mask = rearrange(mask, pattern='b s p k -> (b p) s k')
 
         # [*, N_seq, 1, 1, N_keys]
-        mask_bias = (self.inf * (mask - 1))[..., :, None, None, :]
+        mask_bias = (mask - 1.0).mul_(self.inf)[..., :, None, None, :]
 
         # Project pair biases from head representation
         local_pair_b = self.linear_pair(self.layer_norm_pair(atom_pair_local))
@@ -231,6 +231,7 @@ class AtomAttentionPairBias(nn.Module):
             atom_pair_local: Tensor,  # (bs, n_atoms // n_queries, n_queries, n_keys, c_atompair)
             mask: Optional[Tensor] = None,  # (bs, n_atoms)
             use_deepspeed_evo_attention: bool = False,
+            compile_gates: bool = False,
     ):
         """
         Attention mechanism for sequence-local atom attention.
@@ -249,6 +250,8 @@ class AtomAttentionPairBias(nn.Module):
             use_deepspeed_evo_attention:
                 whether to use Deepspeed's optimized kernel for the attention. It is only usable
                 here if n_queries == n_keys.
+            compile_gates:
+                whether to compile the sigmoid gating into fused kernels on CUDA.
 
         Returns:
             [bs, S, n_atoms, c_atom] updated atom single representation
@@ -259,7 +262,7 @@ class AtomAttentionPairBias(nn.Module):
         bs, S, n_atoms, _ = atom_single.shape
 
         # Input projection
-        a = self.ada_ln(atom_single, atom_proj)  # (bs, S, n_atoms, c_atom)
+        a = self.ada_ln(atom_single, atom_proj, compile_gates=compile_gates)  # (bs, S, n_atoms, c_atom)
 
         # Prep biases
         mask_bias, pair_bias = self._prep_biases(atom_single, atom_pair_local, mask)
@@ -275,6 +278,7 @@ class AtomAttentionPairBias(nn.Module):
             q_x=atom_qx,
             kv_x=atom_kvx,
             biases=[mask_bias, pair_bias],
+            compile_gates=compile_gates,
         )  # (bs * n_atoms // n_queries, S, n_queries, c_atom)
 
         # Reshape back to original, (bs, n_atoms // n_queries, S, n_queries, c_atom)
@@ -282,7 +286,7 @@ class AtomAttentionPairBias(nn.Module):
         output = rearrange(output, 'b p s q c -> b s (p q) c')  # (bs, S, n_atoms, c_atom)
 
         # Output projection
-        output = F.sigmoid(self.output_proj_linear(atom_proj)) * output
+        output = sigmoid_gate(self.output_proj_linear(atom_proj), output, compile_gates=compile_gates)
         return output
 
 
@@ -328,10 +332,12 @@ class AtomTransformerBlock(nn.Module):
             atom_single: Tensor,
             atom_proj: Tensor,
             atom_pair_local: Tensor,
-            mask: Optional[Tensor] = None
+            mask: Optional[Tensor] = None,
+            compile_gates: bool = False
     ) -> Tuple[Tensor, Tensor, Tensor]:
-        atom_single = atom_single + self.atom_attention(atom_single, atom_proj, atom_pair_local, mask)
-        atom_single = atom_single + self.transition(atom_single, atom_proj)
+        atom_single = atom_single + self.atom_attention(atom_single, atom_proj, atom_pair_local, mask,
+                                                        compile_gates=compile_gates)
+        atom_single = atom_single + self.transition(atom_single, atom_proj, compile_gates=compile_gates)
         return atom_single, atom_proj, atom_pair_local
 
 
@@ -399,6 +405,7 @@ class AtomTransformer(nn.Module):
             atom_proj: Tensor,
             atom_pair_local: Tensor,
             mask: Optional[Tensor] = None,
+            compile_gates: bool = False,
     ):
         """
         Forward pass of the AtomTransformer module. Algorithm 23 in AlphaFold3 supplement.
@@ -414,6 +421,8 @@ class AtomTransformer(nn.Module):
             mask:
                 [bs, n_atoms] atom mask tensor where 1.0 indicates atom to be attended and
                 0.0 indicates atom not to be attended. The mask is shared across the S dimension.
+            compile_gates:
+                whether to compile the sigmoid gating into fused kernels on CUDA.
         """
         # Expand atom_proj for proper broadcasting
         atom_proj = atom_proj.unsqueeze(-3)
@@ -422,6 +431,7 @@ class AtomTransformer(nn.Module):
             self.blocks,
             clear_cache_between_blocks=self.clear_cache_between_blocks,
             mask=mask,
+            compile_gates=compile_gates,
         )
 
         atom_single, atom_proj, atom_pair_local = forward_with_checkpointing(
@@ -784,6 +794,7 @@ class AtomAttentionEncoder(nn.Module):
             noisy_pos: Optional[Tensor] = None,  # (bs, S, n_atoms, 3)
             mask: Optional[Tensor] = None,  # (bs, n_atoms)
             use_deepspeed_evo_attention: bool = False,
+            compile_gates: bool = False,
     ) -> AtomAttentionEncoderOutput:
         """Forward pass for the AtomAttentionEncoder module.
         Args:
@@ -820,6 +831,8 @@ class AtomAttentionEncoder(nn.Module):
                 [*, S, N_atoms, 3] Tensor containing the noisy positions. Defaults to None.
             mask:
                 [*, N_atoms]
+            compile_gates:
+                Whether to compile the sigmoid gating into fused kernels on CUDA.
         Returns:
             A namedtuple containing the following fields:
                 token_single:
@@ -837,7 +850,8 @@ class AtomAttentionEncoder(nn.Module):
         local_atom_pair = checkpoint(self.init_pair_repr, features, atom_single_conditioning, z_trunk)
 
         # Cross attention transformer
-        atom_single = self.atom_transformer(atom_single, atom_single_conditioning, local_atom_pair, mask)
+        atom_single = self.atom_transformer(atom_single, atom_single_conditioning, local_atom_pair, mask,
+                                            compile_gates=compile_gates)
 
         # Aggregate per-atom representation to per-token representation
         token_repr = aggregate_atom_to_token(
@@ -931,6 +945,7 @@ class AtomAttentionDecoder(nn.Module):
             tok_idx: Tensor,  # (bs, n_atoms)
             mask: Optional[Tensor] = None,  # (bs, n_atoms)
             use_deepspeed_evo_attention: bool = False,
+            compile_gates: bool = False,
     ) -> Tensor:
         """AtomAttentionDecoder. Algorithm 6 in AlphaFold3 supplement.
         Args:
@@ -949,6 +964,8 @@ class AtomAttentionDecoder(nn.Module):
                 [bs, n_atoms] Token indices that encode which token each atom belongs to.
             mask:
                 [bs, n_atoms] Mask for the atom transformer.
+            compile_gates:
+                Whether to compile the sigmoid gating into fused kernels on CUDA.
         Returns:
             [bs, S, n_atoms, 3] a tensor of per-atom coordinate updates.
         """
@@ -960,7 +977,8 @@ class AtomAttentionDecoder(nn.Module):
         atom_single = atom_single + atom_single_skip_repr  # (bs, S, n_atoms, c_atom)
 
         # Cross-attention transformer
-        atom_single = self.atom_transformer(atom_single, atom_single_skip_proj, atom_pair_skip_repr, mask)
+        atom_single = self.atom_transformer(atom_single, atom_single_skip_proj, atom_pair_skip_repr, mask,
+                                            compile_gates=compile_gates)
 
         # Map to positions update
         r_atom_update = self.linear_update(self.layer_norm(atom_single))
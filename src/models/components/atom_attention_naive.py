@@ -104,7 +104,8 @@ class AtomTransformerBlock(nn.Module):
             atom_proj: Tensor,
             atom_pair: Tensor,
             mask: Optional[Tensor] = None,
-            use_deepspeed_evo_attention: bool = True
+            use_deepspeed_evo_attention: bool = True,
+            compile_gates: bool = False
     ) -> Tuple[Tensor, Tensor, Tensor]:
         # Grab data about the input
         *_, n_atoms, _ = atom_single.shape
@@ -115,10 +116,11 @@ class AtomTransformerBlock(nn.Module):
         # AttentionPairBias
         atom_single = atom_single + self.attention(
             atom_single, atom_proj, atom_pair, mask, betas, 
-            use_deepspeed_evo_attention=use_deepspeed_evo_attention
+            use_deepspeed_evo_attention=use_deepspeed_evo_attention,
+            compile_gates=compile_gates
         )
         # ConditionedTransitionBlock
-        atom_single = atom_single + self.transition(atom_single, atom_proj)
+        atom_single = atom_single + self.transition(atom_single, atom_proj, compile_gates=compile_gates)
         return atom_single, atom_proj, atom_pair
     
 
@@ -186,7 +188,8 @@ class AtomTransformer(nn.Module):
             atom_proj: Tensor,
             atom_pair: Tensor,
             mask: Optional[Tensor] = None,
-            use_deepspeed_evo_attention: bool = True
+            use_deepspeed_evo_attention: bool = True,
+            compile_gates: bool = False
     ):
         """
         Forward pass of the AtomTransformer module. Algorithm 23 in AlphaFold3 supplement.
@@ -207,7 +210,8 @@ class AtomTransformer(nn.Module):
         blocks = prep_blocks(
             self.blocks,
             mask=mask,
-            use_deepspeed_evo_attention=use_deepspeed_evo_attention
+            use_deepspeed_evo_attention=use_deepspeed_evo_attention,
+            compile_gates=compile_gates
         )
 
         atom_single, atom_proj, atom_pair = forward_with_checkpointing(
@@ -547,7 +551,8 @@ class AtomAttentionEncoder(nn.Module):
             z_trunk: Optional[Tensor] = None,  # (bs, n_tokens, c_trunk_pair)
             noisy_pos: Optional[Tensor] = None,  # (bs, S, n_atoms, 3)
             mask: Optional[Tensor] = None,  # (bs, n_atoms)
-            use_deepspeed_evo_attention: bool = True
+            use_deepspeed_evo_attention: bool = True,
+            compile_gates: bool = False
     ) -> AtomAttentionEncoderOutput:
         """Forward pass for the AtomAttentionEncoder module.
         Args:
@@ -601,7 +606,8 @@ class AtomAttentionEncoder(nn.Module):
         atom_pair = checkpoint(self.init_pair_repr, features, atom_single_conditioning, z_trunk)
 
         # Cross attention transformer
-        atom_single = self.atom_transformer(atom_single, atom_single_conditioning, atom_pair, mask, use_deepspeed_evo_attention)
+        atom_single = self.atom_transformer(atom_single, atom_single_conditioning, atom_pair, mask, use_deepspeed_evo_attention,
+                                            compile_gates=compile_gates)
 
         # Aggregate per-atom representation to per-token representation
         token_repr = aggregate_atom_to_token(
@@ -683,7 +689,8 @@ class AtomAttentionDecoder(nn.Module):
             atom_pair_skip_repr,  # (bs, n_atoms, n_atoms, c_atom)
             tok_idx,  # (bs, n_atoms)
             mask: Optional[Tensor] = None,  # (bs, n_atoms)
-            use_deepspeed_evo_attention: bool = True
+            use_deepspeed_evo_attention: bool = True,
+            compile_gates: bool = False
     ):
         """
         AtomAttentionDecoder. Algorithm 6 in AlphaFold3 supplement.
@@ -711,7 +718,8 @@ class AtomAttentionDecoder(nn.Module):
         atom_single = atom_single + atom_single_skip_repr  # (bs, S, n_atoms, c_atom)
 
         # Cross-attention transformer
-        atom_single_repr = self.atom_transformer(atom_single, atom_single_skip_proj, atom_pair_skip_repr, mask, use_deepspeed_evo_attention)
+        atom_single_repr = self.atom_transformer(atom_single, atom_single_skip_proj, atom_pair_skip_repr, mask,
+                                                 use_deepspeed_evo_attention, compile_gates=compile_gates)
 
         # Map to positions update
         r_atom_update = self.linear_update(self.layer_norm(atom_single_repr))
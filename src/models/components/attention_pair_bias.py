@@ -22,9 +22,8 @@ which is useful in the Diffusion module for creating multiple copies of the same
 import torch
 from torch import nn
 from torch.nn import LayerNorm
-from torch.nn import functional as F
 from src.models.components.primitives import (
-    Linear, LinearNoBias, AdaLN, Attention
+    Linear, LinearNoBias, AdaLN, Attention, sigmoid_gate
 )
 from typing import Optional
 from einops import rearrange
@@ -102,11 +101,29 @@ class AttentionPairBias(nn.Module):
             LinearNoBias(self.c_pair, self.num_heads, init='normal')
         )
 
+    def prepare_pair_bias(
+            self,
+            pair_repr: torch.Tensor,  # (*, N, N, c_z)
+    ) -> torch.Tensor:
+        """Projects the pair representation to the per-head pair bias. The result can be passed to forward
+        as precomputed_pair_bias, so that callers that run this module repeatedly on the same pair
+        representation (e.g. every step of diffusion sampling) pay for the pair LayerNorm and projection once.
+        Args:
+            pair_repr:
+                [*, N, N, c_z] pair representation
+        Returns:
+            [*, 1, H, N, N] pair bias
+        """
+        pair_bias = self.proj_pair_bias(pair_repr)  # (bs, n_tokens, n_tokens, n_heads)
+        pair_bias = rearrange(pair_bias, 'b i j h -> b h i j')  # # (bs, h, n, n)
+        return pair_bias.unsqueeze(-4)
+
     def _prep_biases(
             self,
             single_repr: torch.Tensor,  # (*, S, N, c_s)
-            pair_repr: torch.Tensor,  # (*, N, N, c_z)
+            pair_repr: Optional[torch.Tensor] = None,  # (*, N, N, c_z)
             mask: Optional[torch.Tensor] = None,  # (*, N)
+            precomputed_pair_bias: Optional[torch.Tensor] = None,  # (*, 1, H, N, N)
     ):
         """Prepares the mask and pair biases in the shapes expected by the DS4Science attention.
 
@@ -129,12 +146,12 @@ class AttentionPairBias(nn.Module):
             mask = mask.to(single_repr.dtype)
             
         # [*, N_seq, 1, 1, N_res]
-        mask_bias = (self.inf * (mask - 1))[..., :, None, None, :]
+        mask_bias = (mask - 1.0).mul_(self.inf)[..., :, None, None, :]
 
         # Project pair biases per head from pair representation
-        pair_bias = self.proj_pair_bias(pair_repr)  # (bs, n_tokens, n_tokens, n_heads)
-        pair_bias = rearrange(pair_bias, 'b i j h -> b h i j')  # # (bs, h, n, n)
-        pair_bias = pair_bias.unsqueeze(-4)
+        pair_bias = precomputed_pair_bias
+        if pair_bias is None:
+            pair_bias = self.prepare_pair_bias(pair_repr)
         return mask_bias, pair_bias
 
     def forward(
@@ -145,6 +162,8 @@ class AttentionPairBias(nn.Module):
             mask: Optional[torch.Tensor] = None,  # (*, N)
             betas: Optional[torch.Tensor] = None,  # (*, N, N)
             use_deepspeed_evo_attention: bool = False,
+            precomputed_pair_bias: Optional[torch.Tensor] = None,  # (*, 1, H, N, N)
+            compile_gates: bool = False,
     ) -> torch.Tensor:
         """Full self-attention at the token-level with pair bias.
         The DS4Science kernel for MSA row-wise attention is re-purposed here for an efficient
@@ -170,16 +189,20 @@ class AttentionPairBias(nn.Module):
                 [*, N, N] betas to add to the pair bias.
             use_deepspeed_evo_attention:
                 Whether to use deepspeed attention or not.
+            precomputed_pair_bias:
+                [*, 1, H, N, N] output of prepare_pair_bias(pair_repr). If given, pair_repr is not used.
+            compile_gates:
+                Whether to compile the sigmoid gating into fused kernels on CUDA.
         """
 
         # Input projection
         if self.input_gating:
-            a = self.input_proj(single_repr, single_proj)  # AdaLN(a, s)  shape: (bs, S, n_tokens, c_atom)
+            a = self.input_proj(single_repr, single_proj, compile_gates=compile_gates)  # AdaLN(a, s)  shape: (bs, S, n_tokens, c_atom)
         else:
             a = self.input_proj(single_repr)
 
         # Compute the biases
-        mask_bias, pair_bias = self._prep_biases(single_repr, pair_repr, mask)
+        mask_bias, pair_bias = self._prep_biases(single_repr, pair_repr, mask, precomputed_pair_bias)
 
         # Add betas to pair bias (used in naive AtomTransformer)
         if betas is not None:
@@ -191,7 +214,8 @@ class AttentionPairBias(nn.Module):
             q_x=a,
             kv_x=a,
             biases=[mask_bias, pair_bias],
-            use_deepspeed_evo_attention=use_deepspeed_evo_attention
+            use_deepspeed_evo_attention=use_deepspeed_evo_attention,
+            compile_gates=compile_gates
         )  # (bs, S, n_tokens, c_atom)
 
         # Mask the output
@@ -200,5 +224,5 @@ class AttentionPairBias(nn.Module):
 
         # Output projection (from adaLN-Zero)
         if self.input_gating:
-            output = F.sigmoid(self.output_proj_linear(single_proj)) * output
+            output = sigmoid_gate(self.output_proj_linear(single_proj), output, compile_gates=compile_gates)
         return output
@@ -15,29 +15,24 @@
 import importlib
 import math
 from typing import Optional, Callable, List, Tuple, Sequence, Union
-from functools import partialmethod
-import numpy as np
+from functools import partial, partialmethod, lru_cache
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
 from torch.nn import LayerNorm
-from scipy.stats import truncnorm
-from src.utils.tensor_utils import (
-    permute_final_dims,
-    flatten_final_dims,
-)
+from src.utils.tensor_utils import flatten_final_dims
 
+# Resolved once at import; nothing on the forward path queries DeepSpeed's runtime state
 deepspeed_is_installed = importlib.util.find_spec("deepspeed") is not None
 ds4s_is_installed = deepspeed_is_installed and importlib.util.find_spec("deepspeed.ops.deepspeed4science") is not None
-if deepspeed_is_installed:
-    import deepspeed
-
 if ds4s_is_installed:
     from deepspeed.ops.deepspeed4science import DS4Sci_EvoformerAttention
 
+# Inductor needs Triton to generate the CUDA kernels for the compiled gating tails below
+triton_is_installed = importlib.util.find_spec("triton") is not None
 
-def _prod(nums):
-    return np.prod(nums)
+# Standard deviation of the unit normal truncated to [-2, 2], i.e. truncnorm.std(a=-2, b=2)
+TRUNCNORM_STD = 0.87962566103423978
 
 
 def _calculate_fan(linear_weight_shape, fan="fan_in"):
@@ -56,13 +51,8 @@ def trunc_normal_init_(weights, scale=1.0, fan="fan_in"):
     shape = weights.shape
     f = _calculate_fan(shape, fan)
     scale = scale / max(1, f)
-    a, b = -2, 2
-    std = math.sqrt(scale) / truncnorm.std(a=a, b=b, loc=0, scale=1)
-    size = _prod(shape)
-    samples = truncnorm.rvs(a=a, b=b, loc=0, scale=std, size=size)
-    samples = np.reshape(samples, shape)
-    with torch.no_grad():
-        weights.copy_(torch.tensor(samples, device=weights.device))
+    std = math.sqrt(scale) / TRUNCNORM_STD
+    nn.init.trunc_normal_(weights, mean=0.0, std=std, a=-2 * std, b=2 * std)
 
 
 def lecun_normal_init_(weights):
@@ -77,20 +67,25 @@ def glorot_uniform_init_(weights):
     nn.init.xavier_uniform_(weights, gain=1)
 
 
-def final_init_(weights):
-    with torch.no_grad():
-        weights.fill_(0.0)
-
-
 def gating_init_(weights):
-    with torch.no_grad():
-        weights.fill_(0.0)
+    nn.init.zeros_(weights)
 
 
 def normal_init_(weights):
     nn.init.kaiming_normal_(weights, nonlinearity="linear")
 
 
+def _fused_init_(*init_fns):
+    """Returns a Linear init_fn for a weight fusing len(init_fns) equally sized projections. Each block
+    of rows is initialized with its own initializer, so fans match those of the unfused layers."""
+    return partial(_apply_fused_init_, init_fns)
+
+
+def _apply_fused_init_(init_fns, weights, bias):
+    for w, fn in zip(weights.chunk(len(init_fns), dim=0), init_fns):
+        fn(w)
+
+
 class Linear(nn.Linear):
     """
     A Linear layer with built-in nonstandard initializations. Called just
@@ -132,36 +127,43 @@ class Linear(nn.Linear):
                 A custom initializer taking weight and bias as inputs.
                 Overrides init if not None.
         """
+        # Read by reset_parameters(), which nn.Linear.__init__ calls
+        self.init = init
+        self.init_fn = init_fn
         super(Linear, self).__init__(in_dim, out_dim, bias=bias)
 
-        if bias:
-            with torch.no_grad():
-                self.bias.fill_(0)
+        self.precision = precision
 
+    def reset_parameters(self) -> None:
+        # Runs the initializers above in place of nn.Linear's kaiming-uniform init, so that each
+        # parameter is written once. Weight and bias are initialized under a single no_grad block.
         with torch.no_grad():
-            if init_fn is not None:
-                init_fn(self.weight, self.bias)
+            if self.init_fn is not None:
+                # A custom init_fn may cover only part of the weight, so it starts from nn.Linear's init
+                super(Linear, self).reset_parameters()
+                if self.bias is not None:
+                    self.bias.zero_()
+                self.init_fn(self.weight, self.bias)
             else:
-                if init == "default":
+                if self.bias is not None:
+                    self.bias.fill_(1.0 if self.init == "gating" else 0.0)
+
+                if self.init == "default":
                     lecun_normal_init_(self.weight)
-                elif init == "relu":
+                elif self.init == "relu":
                     he_normal_init_(self.weight)
-                elif init == "glorot":
+                elif self.init == "glorot":
                     glorot_uniform_init_(self.weight)
-                elif init == "gating":
+                elif self.init in ("gating", "final"):
                     gating_init_(self.weight)
-                    if bias:
-                        self.bias.fill_(1.0)
-                elif init == "normal":
+                elif self.init == "normal":
                     normal_init_(self.weight)
-                elif init == "final":
-                    final_init_(self.weight)
                 else:
                     raise ValueError("Invalid init string.")
 
-        self.precision = precision
-
     def forward(self, x: torch.Tensor) -> torch.Tensor:
+        # Mixed precision is left to torch.autocast (trainer precision 'bf16-mixed'): the weights stay
+        # in their native dtype and are never re-cast by hand on each call.
         return F.linear(x, self.weight, self.bias)
 
 
@@ -191,17 +193,17 @@ class AdaLN(nn.Module):
 
         # Linear layers for gating and the skip connection
         dim = normalized_shape if isinstance(normalized_shape, int) else normalized_shape[-1]
+        # Kept as a one-element Sequential so checkpoints still load under the to_gamma.0.* keys; the sigmoid
+        # that used to follow the Linear is applied in forward by sigmoid_gate_add
         self.to_gamma = nn.Sequential(
             Linear(dim, dim, init='gating'),
-            nn.Sigmoid()
         )
         self.skip_linear = LinearNoBias(dim, dim, init='final')
 
-    def forward(self, a, s):
+    def forward(self, a, s, compile_gates: bool = False):
         a = self.a_layer_norm(a)
         s = self.s_layer_norm(s)
-        a = self.to_gamma(s) * a + self.skip_linear(s)
-        return a
+        return sigmoid_gate_add(self.to_gamma(s), a, self.skip_linear(s), compile_gates=compile_gates)
 
 
 class Attention(nn.Module):
@@ -250,66 +252,112 @@ class Attention(nn.Module):
         self.no_heads = no_heads
         self.gating = gating
 
-        split_heads = nn.Unflatten(dim=-1, unflattened_size=(self.no_heads, self.c_hidden))
-        # The qkv linear layers project no_heads * c_hidden and then split the dimensions
-        linear_q_class = Linear if proj_q_w_bias else LinearNoBias
-        self.linear_q = nn.Sequential(
-            linear_q_class(self.c_q, self.c_hidden * self.no_heads, init="glorot"),
-            split_heads
-        )
+        # The q, (gate,) k and v projections are stored with rows ordered [q, g, k, v], g only being
+        # present when gating. When the key and value inputs have the query's width, all of them share a
+        # single [n_proj * H * C_hidden, C_q] weight, so that self-attention needs one GEMM while the
+        # query-side and the k/v rows stay contiguous for cross-attention. Otherwise only the query-side
+        # projections are fused and k and v keep weights of their own.
+        self._proj_order = ("q", "g", "k", "v") if self.gating else ("q", "k", "v")
+        self._fuse_qkv = c_q == c_k == c_v
+        proj_inits = {"q": glorot_uniform_init_, "g": gating_init_, "k": glorot_uniform_init_,
+                      "v": glorot_uniform_init_}
+        hc = self.c_hidden * self.no_heads
+        if self._fuse_qkv:
+            self.linear_qgkv = LinearNoBias(
+                self.c_q,
+                len(self._proj_order) * hc,
+                init_fn=_fused_init_(*[proj_inits[n] for n in self._proj_order])
+            )
+        else:
+            q_proj_order = self._proj_order[:-2]
+            self.linear_qg = LinearNoBias(
+                self.c_q,
+                len(q_proj_order) * hc,
+                init_fn=_fused_init_(*[proj_inits[n] for n in q_proj_order])
+            )
+            self.linear_k = LinearNoBias(self.c_k, hc, init="glorot")
+            self.linear_v = LinearNoBias(self.c_v, hc, init="glorot")
+
+        self.q_bias = None
+        if proj_q_w_bias:
+            self.q_bias = nn.Parameter(torch.zeros(self.c_hidden * self.no_heads))
 
-        self.linear_k = nn.Sequential(
-            LinearNoBias(self.c_k, self.c_hidden * self.no_heads, init="glorot"),
-            split_heads
-        )
-        self.linear_v = nn.Sequential(
-            LinearNoBias(self.c_v, self.c_hidden * self.no_heads, init="glorot"),
-            split_heads
-        )
         self.linear_o = LinearNoBias(
             self.c_hidden * self.no_heads, self.c_q, init="final" if residual else "default"
         )
 
-        self.to_gamma = None
-        if self.gating:
-            self.to_gamma = nn.Sequential(
-                LinearNoBias(self.c_q, self.c_hidden * self.no_heads, init="gating"),
-                split_heads,
-                nn.Sigmoid()
-            )
+    _legacy_proj_keys = {"q": "linear_q.0.weight", "g": "to_gamma.0.weight",
+                         "k": "linear_k.0.weight", "v": "linear_v.0.weight"}
+
+    def _load_from_state_dict(self, state_dict, prefix, *args, **kwargs):
+        # Merge the separate linear_q/k/v and to_gamma weights of older checkpoints into the fused layout.
+        # Incomplete sets are left in place so that loading fails on the unexpected and missing keys.
+        if self._fuse_qkv:
+            fused = {"linear_qgkv.weight": self._proj_order}
+        else:
+            fused = {"linear_qg.weight": self._proj_order[:-2], "linear_k.weight": ("k",),
+                     "linear_v.weight": ("v",)}
+        for key, proj_order in fused.items():
+            legacy_keys = [prefix + self._legacy_proj_keys[n] for n in proj_order]
+            if all(legacy_key in state_dict for legacy_key in legacy_keys):
+                state_dict[prefix + key] = torch.cat(
+                    [state_dict.pop(legacy_key) for legacy_key in legacy_keys], dim=0
+                )
+        if prefix + "linear_q.0.bias" in state_dict:
+            state_dict[prefix + "q_bias"] = state_dict.pop(prefix + "linear_q.0.bias")
+        super()._load_from_state_dict(state_dict, prefix, *args, **kwargs)
+
+    def _split_heads(self, x: torch.Tensor, n_proj: int) -> Tuple[torch.Tensor, ...]:
+        # [*, N, n_proj * H * C_hidden] -> n_proj x [*, H, N, C_hidden] with one view and one permute
+        x = x.view(x.shape[:-1] + (n_proj, self.no_heads, self.c_hidden))
+        return x.movedim(-3, 0).transpose(-2, -3).unbind(0)
 
     def _prep_qkv(self,
                   q_x: torch.Tensor,
                   kv_x: torch.Tensor,
                   apply_scale: bool = True
                   ) -> Tuple[
-        torch.Tensor, torch.Tensor, torch.Tensor
+        torch.Tensor, torch.Tensor, torch.Tensor, Optional[torch.Tensor]
     ]:
-        # [*, Q/K/V, H, C_hidden]
-        q = self.linear_q(q_x)
-        k = self.linear_k(kv_x)
-        v = self.linear_v(kv_x)
+        hc = self.c_hidden * self.no_heads
+        n_q_proj = len(self._proj_order) - 2
+        if not self._fuse_qkv:
+            projs = (self._split_heads(self.linear_qg(q_x), n_q_proj) +
+                     self._split_heads(self.linear_k(kv_x), 1) +
+                     self._split_heads(self.linear_v(kv_x), 1))
+        elif _is_same_tensor(q_x, kv_x):
+            # Self-attention: a single GEMM for every projection
+            projs = self._split_heads(self.linear_qgkv(q_x), len(self._proj_order))
+        else:
+            # The query-side rows and the k/v rows are each contiguous, so one GEMM per input
+            w_q, w_kv = self.linear_qgkv.weight.split([n_q_proj * hc, 2 * hc], dim=0)
+            projs = (self._split_heads(F.linear(q_x, w_q), n_q_proj) +
+                     self._split_heads(F.linear(kv_x, w_kv), 2))
+        projs = dict(zip(self._proj_order, projs))
+        q, k, v, g = projs["q"], projs["k"], projs["v"], projs.get("g")
+
+        if self.q_bias is not None:
+            q = q + self.q_bias.view(self.no_heads, 1, self.c_hidden)
 
-        # [*, Q/K/V, H, C_hidden] -> [*, H, Q/K/V, C_hidden]
-        q = q.transpose(-2, -3)
-        k = k.transpose(-2, -3)
-        v = v.transpose(-2, -3)
+        if g is not None:
+            # [*, Q, H, C_hidden], pre-sigmoid
+            g = g.transpose(-2, -3)
 
         if apply_scale:
-            q /= math.sqrt(self.c_hidden)
+            # Not in-place: q is a view produced by unbind
+            q = q / math.sqrt(self.c_hidden)
 
-        return q, k, v
+        return q, k, v, g
 
     def _wrap_up(
             self,
             o: torch.Tensor,
-            q_x: torch.Tensor
+            g: Optional[torch.Tensor],
+            compile_gates: bool = False
     ) -> torch.Tensor:
-        if self.to_gamma is not None:
-            g = self.to_gamma(q_x)
-
+        if g is not None:
             # [*, Q, H, C_hidden]
-            o = o * g
+            o = sigmoid_gate(g, o, compile_gates=compile_gates)
 
         # [*, Q, H * C_hidden]
         o = flatten_final_dims(o, 2)
@@ -325,6 +373,7 @@ class Attention(nn.Module):
             kv_x: torch.Tensor,
             biases: Optional[List[torch.Tensor]] = None,
             use_deepspeed_evo_attention: bool = False,
+            compile_gates: bool = False,
     ) -> torch.Tensor:
         """
         Args:
@@ -338,6 +387,8 @@ class Attention(nn.Module):
                 Whether to use DeepSpeed memory-efficient attention kernel.
                 If none of the "use_<...>" flags are True, a stock PyTorch
                 implementation is used instead
+            compile_gates:
+                Whether to compile the sigmoid gating into a fused kernel on CUDA
         Returns
             [*, Q, C_q] attention update
         """
@@ -345,8 +396,8 @@ class Attention(nn.Module):
         if biases is None:
             biases = []
         # DeepSpeed attention kernel applies scaling internally
-        q, k, v = self._prep_qkv(q_x, kv_x,
-                                 apply_scale=not use_deepspeed_evo_attention)
+        q, k, v, g = self._prep_qkv(q_x, kv_x,
+                                    apply_scale=not use_deepspeed_evo_attention)
 
         if use_deepspeed_evo_attention:
             if len(biases) > 2:
@@ -359,11 +410,57 @@ class Attention(nn.Module):
             o = _attention(q, k, v, biases)
             o = o.transpose(-2, -3)
 
-        o = self._wrap_up(o, q_x)
+        o = self._wrap_up(o, g, compile_gates=compile_gates)
 
         return o
 
 
+def _is_same_tensor(a: torch.Tensor, b: torch.Tensor) -> bool:
+    """Whether a and b view the same elements. chunk_layer reshapes and slices each of its inputs
+    separately, so q_x and kv_x are distinct view objects of the same data in chunked self-attention."""
+    return a is b or (
+        a.data_ptr() == b.data_ptr() and a.shape == b.shape and a.stride() == b.stride()
+        and a.dtype == b.dtype and a.device == b.device
+    )
+
+
+def _sigmoid_gate(gate: torch.Tensor, x: torch.Tensor) -> torch.Tensor:
+    return torch.sigmoid(gate) * x
+
+
+def _sigmoid_gate_add(gate: torch.Tensor, x: torch.Tensor, skip: torch.Tensor) -> torch.Tensor:
+    return torch.sigmoid(gate) * x + skip
+
+
+@lru_cache(maxsize=None)
+def _compiled(fn: Callable) -> Callable:
+    # Compiled on first use rather than at import, so that importing this module never depends on
+    # torch.compile being supported by the running Python / torch
+    return torch.compile(fn, dynamic=True)
+
+
+def sigmoid_gate(gate: torch.Tensor, x: torch.Tensor, compile_gates: bool = False) -> torch.Tensor:
+    """Computes sigmoid(gate) * x. With compile_gates on a CUDA tensor (and Triton installed) the sigmoid
+    and the product are compiled into a single pointwise kernel, so the intermediate sigmoid tensor is
+    never written to memory. Otherwise it runs eagerly."""
+    if compile_gates and triton_is_installed and gate.is_cuda:
+        return _compiled(_sigmoid_gate)(gate, x)
+    return _sigmoid_gate(gate, x)
+
+
+def sigmoid_gate_add(
+        gate: torch.Tensor,
+        x: torch.Tensor,
+        skip: torch.Tensor,
+        compile_gates: bool = False
+) -> torch.Tensor:
+    """Computes sigmoid(gate) * x + skip, dispatching like sigmoid_gate with the addition folded into the
+    same kernel."""
+    if compile_gates and triton_is_installed and gate.is_cuda:
+        return _compiled(_sigmoid_gate_add)(gate, x, skip)
+    return _sigmoid_gate_add(gate, x, skip)
+
+
 def safe_softmax(x, axis=-1):
     """A softmax that returns 0.0s instead of NaNs when all inputs to the softmax
     dim are 0.0. This occurs during sequence-local atom attention if the input is also
@@ -375,10 +472,14 @@ def safe_softmax(x, axis=-1):
 
 
 def _attention(query: torch.Tensor, key: torch.Tensor, value: torch.Tensor, biases: List[torch.Tensor]) -> torch.Tensor:
-    """A stock PyTorch implementation of the attention mechanism.
+    """Attention through torch's fused scaled_dot_product_attention, which dispatches to the
+    FlashAttention / memory-efficient kernels where available. Those kernels avoid the [*, H, Q, K]
+    score and probability tensors, but not the bias: the biases are summed into one additive mask at
+    their broadcast shape (e.g. [*, S, H, Q, K] for a mask bias plus a pair bias), which is then
+    folded into the 4D layout the kernels expect.
     Args:
         query:
-            [*, H, Q, C_hidden] query tensor
+            [*, H, Q, C_hidden] query tensor, already scaled by 1/sqrt(C_hidden)
         key:
             [*, H, K/V, C_hidden] key tensor
         value:
@@ -388,23 +489,43 @@ def _attention(query: torch.Tensor, key: torch.Tensor, value: torch.Tensor, bias
     Returns:
         the resultant tensor [*, H, Q, C_value]
     """
-
-    # [*, H, C_hidden, K]
-    key = permute_final_dims(key, (1, 0))
-
-    # [*, H, Q, K]
-    a = torch.matmul(query, key)
-
-    for b in biases:
-        a = a + b
-
-    a = safe_softmax(a, -1)
-
-    # [*, H, Q, C_hidden]
-    a = torch.matmul(a, value)
+    # Fold the biases into a single additive mask. Each bias is cast before the sum, so the full-size
+    # mask is only ever allocated once, directly in the query dtype.
+    attn_mask = None
+    if len(biases) > 0:
+        attn_mask = biases[0].to(dtype=query.dtype)
+        for b in biases[1:]:
+            attn_mask = attn_mask + b.to(dtype=query.dtype)
+
+    # The FlashAttention / memory-efficient kernels only accept [B, H, Q, C] inputs and fall back
+    # to the math kernel otherwise, so fold all batch dims into one. Only the untouched leading
+    # dims are merged, which keeps this a view for q, k and v.
+    batch_shape = query.shape[:-3]
+    if len(batch_shape) > 1:
+        query, key, value = [x.reshape((-1,) + x.shape[-3:]) for x in (query, key, value)]
+        if attn_mask is not None:
+            # A view when the summed mask already spans every batch dim; a copy only if it broadcasts
+            attn_mask = attn_mask.reshape((1,) * (len(batch_shape) + 3 - attn_mask.dim()) + attn_mask.shape)
+            attn_mask = attn_mask.expand(batch_shape + attn_mask.shape[-3:])
+            attn_mask = attn_mask.reshape((-1,) + attn_mask.shape[-3:])
+    elif len(batch_shape) == 0:
+        # Unbatched [H, Q, C] inputs get the missing batch dim. A 4D bias broadcasts against it and then,
+        # as in the unfused formulation, also sets the batch dim of the output.
+        query, key, value = [x.unsqueeze(0) for x in (query, key, value)]
+
+    # scale=1.0 since the query has already been scaled in Attention._prep_qkv
+    a = F.scaled_dot_product_attention(query, key, value, attn_mask=attn_mask, scale=1.0)
+    if len(batch_shape) > 1:
+        a = a.reshape(batch_shape + a.shape[-3:])
+    elif len(batch_shape) == 0 and (attn_mask is None or attn_mask.dim() < 4):
+        a = a.squeeze(0)
+
+    # Match safe_softmax: fully masked rows produce zeros instead of NaNs
+    a = torch.nan_to_num(a, nan=0.0)
 
     return a
 
+
 def _deepspeed_evo_attn(
         q: torch.Tensor,
         k: torch.Tensor,
@@ -5,7 +5,7 @@ import torch.nn as nn
 import torch.nn.functional as F
 from torch.nn import LayerNorm
 from src.models.components.primitives import AdaLN
-from src.models.components.primitives import Linear, LinearNoBias
+from src.models.components.primitives import Linear, LinearNoBias, sigmoid_gate
 
 
 class Transition(nn.Module):
@@ -50,9 +50,9 @@ class ConditionedTransitionBlock(nn.Module):
         self.output_gating_linear = Linear(input_dim, input_dim, init='gating')
         self.output_gating_linear.bias = nn.Parameter(torch.ones(input_dim) * -2.0)  # gate values will be ~0.11
 
-    def forward(self, a, s):
-        a = self.ada_ln(a, s)
+    def forward(self, a, s, compile_gates: bool = False):
+        a = self.ada_ln(a, s, compile_gates=compile_gates)
         b = F.silu(self.hidden_gating_linear(a)) * self.hidden_linear(a)
         # Output projection (from adaLN-Zero)
-        a = F.sigmoid(self.output_gating_linear(s)) * self.output_linear(b)
+        a = sigmoid_gate(self.output_gating_linear(s), self.output_linear(b), compile_gates=compile_gates)
         return a
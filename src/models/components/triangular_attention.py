@@ -62,6 +62,7 @@ class TriangleAttention(nn.Module):
                chunk_size: int,
                use_deepspeed_evo_attention: bool = False,
                inplace_safe: bool = False,
+               compile_gates: bool = False,
                ) -> torch.Tensor:
         # triangle! triangle!
         mha_inputs = {
@@ -74,6 +75,7 @@ class TriangleAttention(nn.Module):
             partial(
                 self.mha,
                 use_deepspeed_evo_attention=use_deepspeed_evo_attention,
+                compile_gates=compile_gates,
             ),
             mha_inputs,
             chunk_size=chunk_size,
@@ -87,6 +89,7 @@ class TriangleAttention(nn.Module):
                 chunk_size: Optional[int] = None,
                 use_deepspeed_evo_attention: bool = False,
                 inplace_safe: bool = False,
+                compile_gates: bool = False,
                 ) -> torch.Tensor:
         """
         Args:
@@ -103,6 +106,8 @@ class TriangleAttention(nn.Module):
                 whether to use DeepSpeed's EvoFormer attention
             inplace_safe:
                 in-place attention during inference and training
+            compile_gates:
+                whether to compile the sigmoid gating into a fused kernel on CUDA
 
         Returns:
             [*, I, J, C_in] output tensor
@@ -121,7 +126,7 @@ class TriangleAttention(nn.Module):
         x = self.layer_norm(x)
 
         # [*, I, 1, 1, J]
-        mask_bias = (self.inf * (mask - 1))[..., :, None, None, :]
+        mask_bias = (mask - 1.0).mul_(self.inf)[..., :, None, None, :]
 
         # [*, H, I, J]
         triangle_bias = permute_final_dims(self.linear(x), (2, 0, 1))
@@ -138,6 +143,7 @@ class TriangleAttention(nn.Module):
                 chunk_size,
                 use_deepspeed_evo_attention=use_deepspeed_evo_attention,
                 inplace_safe=inplace_safe,
+                compile_gates=compile_gates,
             )
         else:
             x = self.mha(
@@ -145,6 +151,7 @@ class TriangleAttention(nn.Module):
                 kv_x=x,
                 biases=biases,
                 use_deepspeed_evo_attention=use_deepspeed_evo_attention,
+                compile_gates=compile_gates,
             )
 
         if not self.starting:
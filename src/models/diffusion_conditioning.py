@@ -37,8 +37,8 @@ class FourierEmbedding(nn.Module):
 
     def forward(self, t):
         """Compute embeddings"""
-        two_pi = torch.tensor(2 * 3.1415, device=t.device, dtype=t.dtype)
-        return torch.cos(two_pi * (t * self.weight + self.bias))
+        # Scale by a Python scalar so no constant tensor is built and moved to t.device on every call
+        return torch.cos((t * self.weight + self.bias).mul_(2 * 3.1415))
 
 
 class DiffusionConditioning(nn.Module):
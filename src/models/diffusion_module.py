@@ -188,7 +188,8 @@ class DiffusionModule(torch.nn.Module):
             s_inputs: Tensor,  # (bs, n_tokens, c_token)
             s_trunk: Tensor,  # (bs, n_tokens, c_token)
             z_trunk: Tensor,  # (bs, n_tokens, n_tokens, c_pair)
-            use_deepspeed_evo_attention: bool = True
+            use_deepspeed_evo_attention: bool = True,
+            compile_gates: bool = False
     ) -> Tensor:
         """Single denoising step that denoises atomic coordinates based on conditioning.
         Args:
@@ -245,6 +246,8 @@ class DiffusionModule(torch.nn.Module):
                 [*, n_tokens, n_tokens, c_pair] Pair conditioning from Pairformer trunk
             use_deepspeed_evo_attention:
                 Whether to use Deepspeed's optimized kernel for the attention
+            compile_gates:
+                Whether to compile the sigmoid gating into fused kernels on CUDA
 
         """
         # Grab data about the inputs
@@ -270,7 +273,8 @@ class DiffusionModule(torch.nn.Module):
             z_trunk=z_trunk,
             noisy_pos=r_noisy,
             mask=atom_mask,
-            use_deepspeed_evo_attention=use_deepspeed_evo_attention
+            use_deepspeed_evo_attention=use_deepspeed_evo_attention,
+            compile_gates=compile_gates
         )
 
         # Full self-attention on token level
@@ -280,7 +284,8 @@ class DiffusionModule(torch.nn.Module):
             single_proj=token_repr,
             pair_repr=pair_repr,
             mask=token_mask,
-            use_deepspeed_evo_attention=use_deepspeed_evo_attention
+            use_deepspeed_evo_attention=use_deepspeed_evo_attention,
+            compile_gates=compile_gates
         )
 
         token_single = self.token_post_layer_norm(token_single)
@@ -293,7 +298,8 @@ class DiffusionModule(torch.nn.Module):
             atom_pair_skip_repr=atom_encoder_output.atom_pair_skip_repr,  # (bs, n_atoms, n_atoms, c_atom)
             tok_idx=features["atom_to_token"],  # (bs, n_atoms)
             mask=atom_mask,  # (bs, n_atoms)
-            use_deepspeed_evo_attention=use_deepspeed_evo_attention
+            use_deepspeed_evo_attention=use_deepspeed_evo_attention,
+            compile_gates=compile_gates
         )  # (bs, S, n_atoms, 3)
 
         # Rescale updates to positions and combine with input positions
@@ -308,7 +314,8 @@ class DiffusionModule(torch.nn.Module):
             s_trunk: Tensor,
             z_trunk: Tensor,
             samples_per_trunk: int,
-            use_deepspeed_evo_attention: bool = True
+            use_deepspeed_evo_attention: bool = True,
+            compile_gates: bool = False
     ) -> Dict[str, Tensor]:
         """Train step of DiffusionModule.
         Args:
@@ -365,6 +372,8 @@ class DiffusionModule(torch.nn.Module):
                 Total samples = batch_size * samples_per_trunk
             use_deepspeed_evo_attention:
                 Whether to use Deepspeed's Evoformer attention kernels
+            compile_gates:
+                Whether to compile the sigmoid gating into fused kernels on CUDA
         """
         # Grab data about the inputs
         batch_size, n_atoms, _ = ground_truth_atoms.shape
@@ -391,7 +400,8 @@ class DiffusionModule(torch.nn.Module):
             s_inputs=s_inputs,
             s_trunk=s_trunk,
             z_trunk=z_trunk,
-            use_deepspeed_evo_attention=use_deepspeed_evo_attention
+            use_deepspeed_evo_attention=use_deepspeed_evo_attention,
+            compile_gates=compile_gates
         )
         outputs = {
             "denoised_atoms": denoised_atoms,
@@ -413,7 +423,8 @@ class DiffusionModule(torch.nn.Module):
             gamma_min: float = 1.0,
             noise_scale: float = 1.003,
             step_scale: float = 1.5,
-            use_deepspeed_evo_attention: bool = False
+            use_deepspeed_evo_attention: bool = False,
+            compile_gates: bool = False
     ) -> Tensor:
         """Implements SampleDiffusion, Algorithm 18 in AlphaFold3 Supplement.
         Args:
@@ -478,6 +489,8 @@ class DiffusionModule(torch.nn.Module):
                 step scale. Defaults to value used in the paper.
             use_deepspeed_evo_attention:
                 Whether to use Deepspeed's Evoformer attention kernel.
+            compile_gates:
+                Whether to compile the sigmoid gating into fused kernels on CUDA.
         Returns:
             [bs, samples_per_trunk, n_atoms, 3] sampled coordinates
         """
@@ -522,7 +535,8 @@ class DiffusionModule(torch.nn.Module):
                 s_inputs=s_inputs,
                 s_trunk=s_trunk,
                 z_trunk=z_trunk,
-                use_deepspeed_evo_attention=use_deepspeed_evo_attention
+                use_deepspeed_evo_attention=use_deepspeed_evo_attention,
+                compile_gates=compile_gates
             )
             # Back to Vec3Array (float32)
             x_denoised = Vec3Array.from_array(x_denoised)
@@ -65,7 +65,8 @@ class DiffusionTransformerBlock(nn.Module):
             single_proj: Tensor,  # (bs, 1, n_tokens, c_token)
             pair_repr: Tensor,  # (bs, n_tokens, n_tokens, c_pair)
             mask: Optional[Tensor] = None,  # (bs, n_tokens)
-            use_deepspeed_evo_attention: bool = True
+            use_deepspeed_evo_attention: bool = True,
+            compile_gates: bool = False
     ) -> Tuple[Tensor, Tensor, Tensor]:
         """Forward pass of the DiffusionTransformerBlock module. Algorithm 23 in AlphaFold3 supplement.
         TODO: the single_proj and pair_repr do not actually change as a result of this function.
@@ -80,9 +81,11 @@ class DiffusionTransformerBlock(nn.Module):
             single_proj=single_proj,
             pair_repr=pair_repr,
             mask=mask,
-            use_deepspeed_evo_attention=use_deepspeed_evo_attention
+            use_deepspeed_evo_attention=use_deepspeed_evo_attention,
+            compile_gates=compile_gates
         )
-        single_repr = single_repr + self.conditioned_transition_block(single_repr, single_proj)
+        single_repr = single_repr + self.conditioned_transition_block(single_repr, single_proj,
+                                                                      compile_gates=compile_gates)
         return single_repr, single_proj, pair_repr
 
 
@@ -144,7 +147,8 @@ class DiffusionTransformer(nn.Module):
             single_proj: Tensor,  # (*, S, N, c_s)
             pair_repr: Tensor,  # (*, N, N, c_z)
             mask: Optional[Tensor] = None,  # (*, N)
-            use_deepspeed_evo_attention: bool = True
+            use_deepspeed_evo_attention: bool = True,
+            compile_gates: bool = False
     ):
         """Forward pass of the DiffusionTransformer module. Algorithm 23 in AlphaFold3 supplement.
         The DS4Science kernel for MSA row-wise attention is re-purposed here for an efficient
@@ -168,11 +172,14 @@ class DiffusionTransformer(nn.Module):
                 [*, N] attention mask where 1.0 indicates valid token, 0.0 indicates invalid token.
             use_deepspeed_evo_attention:
                 Whether to use deepspeed attention or not.
+            compile_gates:
+                Whether to compile the sigmoid gating into fused kernels on CUDA.
         """
         blocks = prep_blocks(
             self.blocks,
             mask=mask,
             use_deepspeed_evo_attention=use_deepspeed_evo_attention,
+            compile_gates=compile_gates,
             clear_cache_between_blocks=self.clear_cache_between_blocks
         )
 
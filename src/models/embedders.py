@@ -290,6 +290,7 @@ class TemplateEmbedder(nn.Module):
             chunk_size: Optional[int] = None,
             use_deepspeed_evo_attention: bool = False,
             inplace_safe: bool = False,
+            compile_gates: bool = False,
     ) -> Tensor:
         """
         TODO: modify this function to take the same features as the OpenFold template embedder. That will allow
@@ -316,6 +317,8 @@ class TemplateEmbedder(nn.Module):
                 Whether to use DeepSpeed Evo attention within the pair stack.
             inplace_safe:
                 Whether to use inplace operations.
+            compile_gates:
+                Whether to compile the sigmoid gating into fused kernels on CUDA.
         """
         # Grab data about the inputs
         bs, n_templ, n_token = features["template_aatype"].shape
@@ -377,7 +380,8 @@ class TemplateEmbedder(nn.Module):
                                     pair_mask=pair_mask,
                                     chunk_size=chunk_size,
                                     use_deepspeed_evo_attention=use_deepspeed_evo_attention,
-                                    inplace_safe=inplace_safe),
+                                    inplace_safe=inplace_safe,
+                                    compile_gates=compile_gates),
                     inplace=inplace_safe
                     )
             # Normalize and add to u
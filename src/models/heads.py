@@ -117,6 +117,7 @@ class ConfidenceHead(nn.Module):
             use_deepspeed_evo_attention: bool = False,
             use_flash: bool = False,
             inplace_safe: bool = False,
+            compile_gates: bool = False,
     ):
         """
         Args:
@@ -144,6 +145,8 @@ class ConfidenceHead(nn.Module):
                 triangular attention.
             inplace_safe:
                 whether to use inplace ops
+            compile_gates:
+                whether to compile the sigmoid gating into fused kernels on CUDA
         Returns:
             output dictionary containing the logits (pre-softmax) for pLDDT, PAE, PDE,
             and experimentally resolved confidence measures.
@@ -177,7 +180,8 @@ class ConfidenceHead(nn.Module):
             chunk_size=chunk_size,
             use_deepspeed_evo_attention=use_deepspeed_evo_attention,
             use_flash=use_flash,
-            inplace_safe=inplace_safe
+            inplace_safe=inplace_safe,
+            compile_gates=compile_gates
         )
 
         # Project logits
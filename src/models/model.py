@@ -143,7 +143,8 @@ class AlphaFold3(nn.Module):
                     z_mask=pair_mask,
                     chunk_size=self.globals.chunk_size,
                     use_deepspeed_evo_attention=self.globals.use_deepspeed_evo_attention,
-                    inplace_safe=inplace_safe
+                    inplace_safe=inplace_safe,
+                    compile_gates=self.globals.compile_gates
                 ),
                 inplace=inplace_safe
                 )
@@ -155,7 +156,8 @@ class AlphaFold3(nn.Module):
             pair_mask=pair_mask,
             chunk_size=self.globals.chunk_size,
             use_deepspeed_evo_attention=self.globals.use_deepspeed_evo_attention,
-            inplace_safe=inplace_safe
+            inplace_safe=inplace_safe,
+            compile_gates=self.globals.compile_gates
         )
         return s, z
 
@@ -196,7 +198,8 @@ class AlphaFold3(nn.Module):
             pair_mask=pair_mask,
             chunk_size=self.globals.chunk_size,
             use_deepspeed_evo_attention=self.globals.use_deepspeed_evo_attention,
-            inplace_safe=inplace_safe
+            inplace_safe=inplace_safe,
+            compile_gates=self.globals.compile_gates
         )
         return confidences
 
@@ -355,6 +358,7 @@ class AlphaFold3(nn.Module):
                 z_trunk=z,
                 samples_per_trunk=self.globals.samples_per_trunk,
                 use_deepspeed_evo_attention=self.globals.use_deepspeed_evo_attention,
+                compile_gates=self.globals.compile_gates,
             )
             # Add the denoised atoms, timesteps, and augmented gt atoms for loss calculation
             outputs.update(diff_output)
@@ -367,7 +371,8 @@ class AlphaFold3(nn.Module):
             z_trunk=z,
             n_steps=n_steps,
             samples_per_trunk=1,  # only a single sample during rollout
-            use_deepspeed_evo_attention=self.globals.use_deepspeed_evo_attention
+            use_deepspeed_evo_attention=self.globals.use_deepspeed_evo_attention,
+            compile_gates=self.globals.compile_gates
         )
         outputs["sampled_positions"] = sampled_positions
 
@@ -108,7 +108,6 @@ class MSAPairWeightedAveraging(nn.Module):
         Returns:
             [*, N_seq, N_res, C_m] updated MSA representation
         """
-        *_, n_seq, n_res, _ = m.shape
 
         # Input projections
         m_ln = self.msa_ln(m)
@@ -121,18 +120,15 @@ class MSAPairWeightedAveraging(nn.Module):
         # Masking and shape wrangling
         if z_mask is not None:
             z_mask = z_mask.unsqueeze(-1)  # (*, N_res, N_res, 1)
-            z_mask = self.inf * (z_mask - 1)  # mask before softmax
-            b = b + z_mask
+            b = torch.add(b, z_mask - 1.0, alpha=self.inf)  # mask before softmax
 
         if msa_mask is not None:
             v = v * msa_mask.unsqueeze(-1).unsqueeze(-1)
-        new_v_shape = (v.shape[:-4] + (n_seq, n_res, n_res, self.no_heads, self.c_hidden))
-        v = v.unsqueeze(-4).expand(new_v_shape)  # (*, seq, res, res, heads, c_hidden)
 
-        # Weighted average with gating
-        weights = self.softmax(b)
-        weights = weights.unsqueeze(-4).unsqueeze(-1)  # (*, 1, res, res, heads, 1)
-        o = g * torch.sum(v * weights, dim=-3)  # (*, seq, res, heads, c_hidden)
+        # Weighted average with gating. The einsum contracts over the key residues directly instead of
+        # materializing the (*, seq, res, res, heads, c_hidden) product of v and the weights.
+        weights = self.softmax(b)  # (*, res, res, heads)
+        o = g * torch.einsum("...ijh,...sjhc->...sihc", weights, v)  # (*, seq, res, heads, c_hidden)
 
         # Output projection
         output = self.output_proj(flatten_final_dims(o, 2))  # (*, seq, res, c_hidden * heads)
@@ -252,6 +248,7 @@ class MSAModuleBlock(nn.Module):
             chunk_size: Optional[int] = None,
             use_deepspeed_evo_attention: bool = False,
             inplace_safe: bool = False,
+            compile_gates: bool = False,
     ):
         """
         Args:
@@ -269,6 +266,8 @@ class MSAModuleBlock(nn.Module):
                 whether to use Deepspeed's optimized kernels for attention
             inplace_safe:
                 whether to perform ops inplace
+            compile_gates:
+                whether to compile the sigmoid gating into fused kernels on CUDA
         Returns:
             Tuple of:
                 [*, N_seq, N_res, C_m] updated MSA representation,
@@ -307,6 +306,7 @@ class MSAModuleBlock(nn.Module):
             chunk_size=chunk_size,
             use_deepspeed_evo_attention=use_deepspeed_evo_attention,
             inplace_safe=inplace_safe,
+            compile_gates=compile_gates,
         )
         return m, z
 
@@ -417,6 +417,7 @@ class MSAModule(nn.Module):
             chunk_size: Optional[int] = None,
             use_deepspeed_evo_attention: bool = False,
             inplace_safe: bool = False,
+            compile_gates: bool = False,
     ) -> Tensor:
         """
         Args:
@@ -438,6 +439,8 @@ class MSAModule(nn.Module):
                 whether to use Deepspeed's optimized kernels for attention
             inplace_safe:
                 whether to perform ops inplace
+            compile_gates:
+                whether to compile the sigmoid gating into fused kernels on CUDA
         """
         # Prep MSA mask
         msa_mask = feats["msa_mask"]
@@ -450,7 +453,8 @@ class MSAModule(nn.Module):
             z_mask=z_mask,
             chunk_size=chunk_size,
             use_deepspeed_evo_attention=use_deepspeed_evo_attention,
-            inplace_safe=inplace_safe
+            inplace_safe=inplace_safe,
+            compile_gates=compile_gates
         )
 
         # Initialize the MSA embedding
@@ -106,7 +106,8 @@ class PairStack(nn.Module):
             chunk_size: Optional[int] = None,
             use_deepspeed_evo_attention: bool = False,
             inplace_safe: bool = False,
-            _attn_chunk_size: Optional[int] = None
+            _attn_chunk_size: Optional[int] = None,
+            compile_gates: bool = False
     ) -> Tensor:
 
         if _attn_chunk_size is None:
@@ -146,6 +147,7 @@ class PairStack(nn.Module):
                         chunk_size=_attn_chunk_size,
                         use_deepspeed_evo_attention=use_deepspeed_evo_attention,
                         inplace_safe=inplace_safe,
+                        compile_gates=compile_gates,
                     )
                 ),
                 inplace=inplace_safe,
@@ -159,6 +161,7 @@ class PairStack(nn.Module):
                         chunk_size=_attn_chunk_size,
                         use_deepspeed_evo_attention=use_deepspeed_evo_attention,
                         inplace_safe=inplace_safe,
+                        compile_gates=compile_gates,
                     )
                 ),
                 inplace=inplace_safe,
@@ -214,6 +217,7 @@ class PairformerStackBlock(nn.Module):
             chunk_size: Optional[int] = None,
             use_deepspeed_evo_attention: bool = False,
             inplace_safe: bool = False,
+            compile_gates: bool = False,
     ) -> Tuple[Tensor, Tensor]:
         z = self.pair_stack(
             z=z,
@@ -221,6 +225,7 @@ class PairformerStackBlock(nn.Module):
             chunk_size=chunk_size,
             use_deepspeed_evo_attention=use_deepspeed_evo_attention,
             inplace_safe=inplace_safe,
+            compile_gates=compile_gates,
         )
         s = add(
             s,
@@ -228,7 +233,8 @@ class PairformerStackBlock(nn.Module):
                 single_repr=s,
                 pair_repr=z,
                 mask=single_mask,
-                use_deepspeed_evo_attention=use_deepspeed_evo_attention),
+                use_deepspeed_evo_attention=use_deepspeed_evo_attention,
+                compile_gates=compile_gates),
             inplace=inplace_safe
         )
         s = add(s, self.transition(s), inplace=inplace_safe)
@@ -312,6 +318,7 @@ class PairformerStack(nn.Module):
             chunk_size: Optional[int] = None,
             use_deepspeed_evo_attention: bool = False,
             inplace_safe: bool = False,
+            compile_gates: bool = False,
     ) -> Tuple[Tensor, Tensor]:
         """
         Args:
@@ -330,6 +337,8 @@ class PairformerStack(nn.Module):
                 Whether to use DeepSpeed memory efficient kernel withing Triangular attention.
             inplace_safe:
                 Whether to use inference time inplace operations to save memory.
+            compile_gates:
+                Whether to compile the sigmoid gating into fused kernels on CUDA.
         """
         blocks = prep_blocks(
             self.blocks,
@@ -339,6 +348,7 @@ class PairformerStack(nn.Module):
             chunk_size=chunk_size,
             use_deepspeed_evo_attention=use_deepspeed_evo_attention,
             inplace_safe=inplace_safe,
+            compile_gates=compile_gates,
         )
 
         s = s.unsqueeze(-3)  # Add N_seq dimension as N_seq=1
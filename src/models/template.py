@@ -45,7 +45,8 @@ class TemplatePairStack(nn.Module):
             pair_mask: Tensor,
             chunk_size: Optional[int] = None,
             use_deepspeed_evo_attention: bool = False,
-            inplace_safe: bool = False
+            inplace_safe: bool = False,
+            compile_gates: bool = False
     ):
         blocks = [
             partial(
@@ -53,7 +54,8 @@ class TemplatePairStack(nn.Module):
                 pair_mask=pair_mask,
                 chunk_size=chunk_size,
                 use_deepspeed_evo_attention=use_deepspeed_evo_attention,
-                inplace_safe=inplace_safe
+                inplace_safe=inplace_safe,
+                compile_gates=compile_gates
             )
             for block in self.blocks
         ]
@@ -72,7 +74,8 @@ class TemplatePairStack(nn.Module):
             pair_mask: Tensor,
             chunk_size: Optional[int] = None,
             use_deepspeed_evo_attention: bool = False,
-            inplace_safe: bool = False
+            inplace_safe: bool = False,
+            compile_gates: bool = False
     ) -> Tensor:
 
         blocks = self._prep_blocks(
@@ -80,7 +83,8 @@ class TemplatePairStack(nn.Module):
             pair_mask=pair_mask,
             chunk_size=chunk_size,
             use_deepspeed_evo_attention=use_deepspeed_evo_attention,
-            inplace_safe=inplace_safe
+            inplace_safe=inplace_safe,
+            compile_gates=compile_gates
         )
 
         blocks_per_ckpt = self.blocks_per_ckpt
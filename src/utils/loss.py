@@ -49,10 +49,10 @@ def smooth_lddt_loss(
     # Compute distance difference for all pairs of atoms
     delta_lm = torch.abs(delta_x_gt_lm - delta_x_lm)  # (bs, n_atoms, n_atoms)
     epsilon_lm = torch.div(
-        (F.sigmoid(torch.sub(0.5, delta_lm)) +
-         F.sigmoid(torch.sub(1.0, delta_lm)) +
-         F.sigmoid(torch.sub(2.0, delta_lm)) +
-         F.sigmoid(torch.sub(4.0, delta_lm))),
+        (torch.sigmoid_(torch.sub(0.5, delta_lm)) +
+         torch.sigmoid_(torch.sub(1.0, delta_lm)) +
+         torch.sigmoid_(torch.sub(2.0, delta_lm)) +
+         torch.sigmoid_(torch.sub(4.0, delta_lm))),
         4.0)
 
     # Restrict to bespoke inclusion radius
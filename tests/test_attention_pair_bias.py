@@ -41,3 +41,12 @@ class TestAttentionPairBias(unittest.TestCase):
         output_bias_initial_value = self.module.output_proj_linear.bias.data.mean().item()
         self.assertAlmostEqual(output_bias_initial_value, -2.0, places=5,
                                msg="Output projection bias should be initialized to -2.")
+
+    def test_precomputed_pair_bias(self):
+        """Test that a precomputed pair bias gives the same output as projecting the pair representation."""
+        module = AttentionPairBias(dim=self.embed_dim, no_heads=self.num_heads, c_pair=self.c_pair, residual=False)
+        pair_bias = module.prepare_pair_bias(self.pair_repr)
+        self.assertEqual(pair_bias.shape, (self.batch_size, 1, self.num_heads, self.n_tokens, self.n_tokens))
+        expected = module(self.single_repr, self.single_proj, self.pair_repr, self.mask)
+        output = module(self.single_repr, self.single_proj, mask=self.mask, precomputed_pair_bias=pair_bias)
+        self.assertTrue(torch.allclose(output, expected, atol=1e-6))
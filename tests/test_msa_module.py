@@ -24,6 +24,30 @@ class TestMSAPairWeightedAveraging(unittest.TestCase):
 
         self.assertEqual(output.shape, (self.batch_size, self.n_seq, self.n_tokens, self.c_msa))
 
+    def test_matches_expanded_reference(self):
+        n_tokens = 16
+        module = MSAPairWeightedAveraging(self.c_msa, self.c_z, self.c_hidden, self.no_heads)
+        with torch.no_grad():
+            for p in module.parameters():
+                p.normal_(std=0.1)
+        m = torch.randn((self.batch_size, self.n_seq, n_tokens, self.c_msa))
+        z = torch.randn((self.batch_size, n_tokens, n_tokens, self.c_z))
+        msa_mask = torch.randint(0, 2, (self.batch_size, self.n_seq, n_tokens)).float()
+        z_mask = torch.randint(0, 2, (self.batch_size, n_tokens, n_tokens)).float()
+        output = module(m, z, msa_mask, z_mask)
+
+        # Expand-multiply-sum formulation
+        m_ln = module.msa_ln(m)
+        v = module.msa_proj(m_ln) * msa_mask[..., None, None]
+        g = module.to_gamma(m_ln)
+        b = module.proj_pair_bias(z) + (z_mask[..., None] - 1.0) * module.inf
+        weights = module.softmax(b)
+        v = v.unsqueeze(-4).expand(v.shape[:-4] + (self.n_seq, n_tokens, n_tokens, self.no_heads, self.c_hidden))
+        o = g * torch.sum(v * weights.unsqueeze(-4).unsqueeze(-1), dim=-3)
+        expected = module.output_proj(o.flatten(-2))
+
+        self.assertTrue(torch.allclose(output, expected, atol=1e-5))
+
 
 class TestMSAModuleBlock(unittest.TestCase):
     def setUp(self):
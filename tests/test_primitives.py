@@ -1,7 +1,9 @@
+import math
 import unittest
 import torch
 from torch import nn
-from src.models.components.primitives import AdaLN, Linear, LinearNoBias, safe_softmax, _attention, _deepspeed_evo_attn
+from src.models.components.primitives import AdaLN, Attention, Linear, LinearNoBias, safe_softmax, _attention, _deepspeed_evo_attn, \
+    sigmoid_gate, sigmoid_gate_add, TRUNCNORM_STD
 
 
 class TestAdaLN(unittest.TestCase):
@@ -35,6 +37,18 @@ class TestAdaLN(unittest.TestCase):
         output = self.model(a, s)
         self.assertEqual(output.shape, a.shape)
 
+    def test_matches_unfused_reference(self):
+        with torch.no_grad():
+            for p in self.model.parameters():
+                p.normal_()
+        a = torch.randn(2, 10)
+        s = torch.randn(2, 10)
+        output = self.model(a, s)
+        a_ln = self.model.a_layer_norm(a)
+        s_ln = self.model.s_layer_norm(s)
+        expected = torch.sigmoid(self.model.to_gamma(s_ln)) * a_ln + self.model.skip_linear(s_ln)
+        self.assertTrue(torch.allclose(output, expected, atol=1e-6))
+
     def test_forward_pass_large_input(self):
         a = torch.randn(1000, 10)
         s = torch.randn(1000, 10)
@@ -73,6 +87,37 @@ class TestLinear(unittest.TestCase):
         output = self.model(x)
         self.assertEqual(output.shape, (2, 5))
 
+    def test_default_init_is_truncated(self):
+        model = Linear(256, 128)
+        std = math.sqrt(1.0 / 256) / TRUNCNORM_STD
+        self.assertTrue(torch.all(model.weight.abs() <= 2 * std))
+        self.assertAlmostEqual(model.weight.std().item(), math.sqrt(1.0 / 256), delta=5e-3)
+
+    def test_gating_and_final_init(self):
+        gating = Linear(10, 5, init="gating")
+        self.assertTrue(torch.all(gating.weight == 0.0))
+        self.assertTrue(torch.all(gating.bias == 1.0))
+        final = Linear(10, 5, init="final")
+        self.assertTrue(torch.all(final.weight == 0.0))
+        self.assertTrue(torch.all(final.bias == 0.0))
+
+    def test_reset_parameters_reruns_init(self):
+        gating = Linear(10, 5, init="gating")
+        with torch.no_grad():
+            gating.weight.fill_(float("nan"))
+            gating.bias.fill_(float("nan"))
+        gating.reset_parameters()
+        self.assertTrue(torch.all(gating.weight == 0.0))
+        self.assertTrue(torch.all(gating.bias == 1.0))
+
+    def test_partial_init_fn_keeps_default_init(self):
+        def init_fn(weight, bias):
+            weight[:2].zero_()
+        model = Linear(10, 5, init_fn=init_fn)
+        self.assertTrue(torch.all(model.weight[:2] == 0.0))
+        self.assertTrue(torch.all(torch.isfinite(model.weight)))
+        self.assertTrue(torch.all(model.weight[2:] != 0.0))
+
 
 class TestLinearNoBias(unittest.TestCase):
     def setUp(self):
@@ -94,6 +139,19 @@ class TestLinearNoBias(unittest.TestCase):
         self.assertEqual(output.shape, (2, 5))
 
 
+class TestSigmoidGate(unittest.TestCase):
+    def test_compiled_gates_match_eager(self):
+        # Compiled on CUDA when available, eager on CPU
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+        gate = torch.randn(2, 5, 8, device=device)
+        x = torch.randn(2, 5, 8, device=device)
+        skip = torch.randn(2, 5, 8, device=device)
+        expected = torch.sigmoid(gate) * x
+        self.assertTrue(torch.allclose(sigmoid_gate(gate, x, compile_gates=True), expected, atol=1e-6))
+        self.assertTrue(torch.allclose(sigmoid_gate_add(gate, x, skip, compile_gates=True), expected + skip,
+                                       atol=1e-6))
+
+
 class TestSafeSoftmax(unittest.TestCase):
     def test_safe_softmax(self):
         x = torch.tensor([[0.0, 0.0], [1.0, 1.0]])
@@ -115,6 +173,110 @@ class TestAttention(unittest.TestCase):
         output = _attention(query, key, value, biases)
         self.assertEqual(output.shape, (2, 2, 2, 3))
 
+    def test_attention_matches_reference(self):
+        query = torch.randn(2, 4, 5, 3)
+        key = torch.randn(2, 4, 6, 3)
+        value = torch.randn(2, 4, 6, 3)
+        biases = [torch.randn(2, 1, 1, 6), torch.randn(1, 4, 5, 6)]
+        a = torch.matmul(query, key.transpose(-1, -2)) + biases[0] + biases[1]
+        expected = torch.matmul(safe_softmax(a, -1), value)
+        output = _attention(query, key, value, biases)
+        self.assertTrue(torch.allclose(output, expected, atol=1e-5))
+
+    def test_attention_unbatched_with_batched_bias(self):
+        query = torch.randn(4, 5, 3)
+        key = torch.randn(4, 6, 3)
+        value = torch.randn(4, 6, 3)
+        biases = [torch.randn(1, 4, 5, 6)]
+        expected = torch.matmul(safe_softmax(torch.matmul(query, key.transpose(-1, -2)) + biases[0], -1), value)
+        output = _attention(query, key, value, biases)
+        self.assertEqual(output.shape, (1, 4, 5, 3))
+        self.assertTrue(torch.allclose(output, expected, atol=1e-5))
+        self.assertEqual(_attention(query, key, value, []).shape, (4, 5, 3))
+
+    def test_attention_extra_batch_dims(self):
+        query = torch.randn(2, 3, 4, 5, 8)
+        key = torch.randn(2, 3, 4, 6, 8)
+        value = torch.randn(2, 3, 4, 6, 8)
+        biases = [torch.randn(2, 3, 1, 1, 6), torch.randn(2, 1, 4, 5, 6)]
+        a = torch.matmul(query, key.transpose(-1, -2)) + biases[0] + biases[1]
+        expected = torch.matmul(safe_softmax(a, -1), value)
+        output = _attention(query, key, value, biases)
+        self.assertEqual(output.shape, (2, 3, 4, 5, 8))
+        self.assertTrue(torch.allclose(output, expected, atol=1e-5))
+
+
+class TestAttentionModule(unittest.TestCase):
+    def setUp(self):
+        self.module = Attention(c_q=16, c_k=16, c_v=16, c_hidden=4, no_heads=4, residual=False,
+                           proj_q_w_bias=True)
+
+    def test_gate_rows_initialized_to_zero(self):
+        hc = 16
+        self.assertTrue(torch.all(self.module.linear_qgkv.weight[hc:2 * hc] == 0.0))
+
+    def test_fused_qkv_matches_cross_attention_path(self):
+        x = torch.randn(2, 5, 16)
+        self_out = self.module(x, x)
+        cross_out = self.module(x, x.clone())
+        self.assertTrue(torch.allclose(self_out, cross_out, atol=1e-6))
+
+    def test_aliased_views_take_single_gemm_path(self):
+        calls = []
+        self.module.linear_qgkv.register_forward_hook(lambda *args: calls.append(1))
+        x = torch.randn(2, 5, 16)
+        # chunk_layer hands q_x and kv_x over as separate views of the same data
+        self.module(x.reshape(-1, 5, 16)[0:2], x.reshape(-1, 5, 16)[0:2])
+        self.assertEqual(len(calls), 1)
+        self.module(x, x.clone())
+        self.assertEqual(len(calls), 1)
+
+    def test_cross_attention_with_different_dims(self):
+        module = Attention(c_q=16, c_k=8, c_v=8, c_hidden=4, no_heads=4, residual=False,
+                           proj_q_w_bias=True)
+        with torch.no_grad():
+            for p in module.parameters():
+                p.normal_()
+        q_x = torch.randn(2, 5, 16)
+        kv_x = torch.randn(2, 7, 8)
+        output = module(q_x, kv_x)
+        self.assertEqual(output.shape, (2, 5, 16))
+
+        legacy = module.state_dict()
+        w_q, w_g = legacy.pop("linear_qg.weight").split(16, dim=0)
+        legacy["linear_q.0.weight"] = w_q
+        legacy["linear_q.0.bias"] = legacy.pop("q_bias")
+        legacy["to_gamma.0.weight"] = w_g
+        legacy["linear_k.0.weight"] = legacy.pop("linear_k.weight")
+        legacy["linear_v.0.weight"] = legacy.pop("linear_v.weight")
+        loaded = Attention(c_q=16, c_k=8, c_v=8, c_hidden=4, no_heads=4, residual=False,
+                           proj_q_w_bias=True)
+        loaded.load_state_dict(legacy)
+        self.assertTrue(torch.allclose(loaded(q_x, kv_x), output))
+
+    def test_load_legacy_projection_state_dict(self):
+        hc = 16
+        with torch.no_grad():
+            self.module.linear_qgkv.weight.normal_()
+        legacy = self.module.state_dict()
+        w_q, w_g, w_k, w_v = legacy.pop("linear_qgkv.weight").split(hc, dim=0)
+        legacy["linear_q.0.weight"] = w_q
+        legacy["linear_q.0.bias"] = legacy.pop("q_bias")
+        legacy["linear_k.0.weight"] = w_k
+        legacy["linear_v.0.weight"] = w_v
+        legacy["to_gamma.0.weight"] = w_g
+
+        x = torch.randn(2, 5, 16)
+        module = Attention(c_q=16, c_k=16, c_v=16, c_hidden=4, no_heads=4, residual=False,
+                           proj_q_w_bias=True)
+        module.load_state_dict(legacy)
+        self.assertTrue(torch.allclose(module(x, x), self.module(x, x)))
+
+        # An incomplete legacy set is not merged and fails to load
+        del legacy["to_gamma.0.weight"]
+        with self.assertRaises(RuntimeError):
+            module.load_state_dict(legacy)
+
 
 class TestDeepSpeedEvoAttn(unittest.TestCase):
     def test_deepspeed_evo_attn(self):